@@ -0,0 +1,97 @@
+"""
+Contains the Curriculum class.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from filler import FillerEnv
+
+# each stage is a set of FillerEnv arguments, ordered from the cheapest and easiest to the hardest
+# an opponent_depth of 0 is a random opponent, 1 is greedy, and more searches ahead that many turns
+# max_turns grows with the board and the number of colors so that the games can finish
+DEFAULT_STAGES = [{'number_of_colors': 4, 'height': 5, 'width': 4, 'opponent_depth': 0, 'max_turns': 25},
+                  {'number_of_colors': 4, 'height': 5, 'width': 4, 'opponent_depth': 1, 'max_turns': 25},
+                  {'number_of_colors': 5, 'height': 6, 'width': 5, 'opponent_depth': 1, 'max_turns': 25},
+                  {'number_of_colors': 6, 'height': 8, 'width': 5, 'opponent_depth': 1, 'max_turns': 30},
+                  {'number_of_colors': 6, 'height': 8, 'width': 5, 'opponent_depth': 2, 'max_turns': 40},
+                  {'number_of_colors': 6, 'height': 12, 'width': 8, 'opponent_depth': 2, 'max_turns': 60},
+                  {'number_of_colors': 8, 'height': 12, 'width': 8, 'opponent_depth': 3, 'max_turns': 80}]
+
+
+class Curriculum:
+    """
+    Schedules the board size, number of colors, and opponent strength based on the rolling win rate.
+    """
+
+    def __init__(self, stages=None, window=100, promotion_win_rate=0.6):
+        """
+        Initializes the curriculum object.
+
+        Parameters
+        ----------
+        stages : list, optional
+            a list of dictionaries of FillerEnv arguments, by default DEFAULT_STAGES
+        window : int, optional
+            the number of recent games used for the win rate, by default 100
+        promotion_win_rate : float, optional
+            the win rate needed to move to the next stage, by default 0.6
+        """
+        self.stages = stages if stages else DEFAULT_STAGES
+        self.window = window
+        self.promotion_win_rate = promotion_win_rate
+
+        self.stage = 0
+        self.results = deque(maxlen=window)
+
+    def make_env(self):
+        """
+        Creates the environment for the current stage.
+
+        Returns
+        -------
+        FillerEnv
+            the environment with the current stage's arguments
+        """
+        return FillerEnv(**self.stages[self.stage])
+
+    def record(self, won):
+        """
+        Records the result of a game.
+
+        Parameters
+        ----------
+        won : bool
+            True if the RL player won the game, False otherwise
+        """
+        self.results.append(won)
+
+    def get_win_rate(self):
+        """
+        Returns the win rate over the recent games of the current stage.
+
+        Returns
+        -------
+        float
+            the win rate, or 0 if no games have been recorded
+        """
+        return np.mean(self.results) if self.results else 0.0
+
+    def update(self):
+        """
+        Moves to the next stage if the window is full and the win rate is high enough.
+        The results are cleared so that the win rate is only measured on the new stage.
+
+        Returns
+        -------
+        bool
+            True if the curriculum moved to the next stage, False otherwise
+        """
+        if self.stage + 1 >= len(self.stages) or len(self.results) < self.window or \
+                self.get_win_rate() < self.promotion_win_rate:
+            return False
+
+        self.stage += 1
+        self.results.clear()
+        return True
@@ -2,6 +2,8 @@
 Contains the FillerGame and FillerBoard classes.
 """
 
+from functools import lru_cache
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -22,11 +24,14 @@ class FillerEnv:
     Implements the RL environment for the Filler game.
     """
 
-    def __init__(self, number_of_colors, height, width):
+    def __init__(self, number_of_colors, height, width, topology='grid', opponent_depth=1, max_turns=25):
         self.game = None
         self.number_of_colors = number_of_colors
         self.height = height
         self.width = width
+        self.topology = topology
+        self.opponent_depth = opponent_depth
+        self.max_turns = max_turns
 
     def reset(self, save_images_suffix=False):
         """
@@ -42,23 +47,48 @@ class FillerEnv:
         Returns
         -------
         np.ndarray
-            the gameboard in numpy format with shape (height, width)
+            the state of the gameboard with shape (1, height, width, len(COLORS) + 2)
         """
         self.game = FillerGame(number_of_colors=self.number_of_colors, height=self.height, width=self.width,
-                               game_type=FillerGame.game_types['r_l'], save_images_suffix=save_images_suffix)
+                               game_type=FillerGame.game_types['r_l'], save_images_suffix=save_images_suffix,
+                               topology=self.topology, opponent_depth=self.opponent_depth)
+        return self.get_state()
+
+    def restore(self, snapshot):
+        """
+        Resets the enviroment to a snapshot of the current game.
+
+        Parameters
+        ----------
+        snapshot : np.ndarray
+            a snapshot returned by FillerGame.snapshot()
+
+        Returns
+        -------
+        np.ndarray
+            the state of the gameboard with shape (1, height, width, len(COLORS) + 2)
+        """
+        self.game.restore(snapshot)
         return self.get_state()
 
     def get_state(self):
         """
-        Returns the current state of the gameboard and the two player's colors.
+        Returns the current state of the gameboard and the cells that belong to the two players.
+        The colors are one-hot encoded over all of the COLORS, so the shape only depends on the board size
+        and not on the number of colors.
 
         Returns
         -------
         np.ndarray
-            a flat 1D representation of the gameboard appended by the two players' colors
+            the state with shape (1, height, width, len(COLORS) + 2), where the last two channels are
+            the cells that belong to the first and second player
         """
-        return np.append(self.game.game_board.get_board(),
-                         [self.game.player_1.color, self.game.player_2.color])[None, :]
+        game_board = self.game.game_board
+        state = np.zeros((self.height, self.width, len(COLORS) + 2), dtype=np.float32)
+        state[..., :len(COLORS)] = np.eye(len(COLORS), dtype=np.float32)[game_board.get_board()]
+        state[..., -2] = game_board.get_filled_mask(self.game.player_1.player_id)
+        state[..., -1] = game_board.get_filled_mask(self.game.player_2.player_id)
+        return state[None, ...]
 
     def step(self, action):
         """
@@ -73,13 +103,13 @@ class FillerEnv:
         Returns
         -------
         np.ndarray, int, bool
-            the gameboard in numpy format with shape (height, width), reward, \
+            the state of the gameboard with shape (1, height, width, len(COLORS) + 2), reward, \
                 and if the game is over
         """
         self.game.play_single_turn([action])
         next_obs = self.get_state()
         reward = self.game.player_1.score - self.game.turn_count
-        done = self.game.check_for_end_of_game() or self.game.turn_count > 25
+        done = self.game.check_for_end_of_game() or self.game.turn_count > self.max_turns
 
         if done:
             if self.game.player_1.score > self.game.player_2.score:
@@ -101,29 +131,41 @@ class FillerGame:
 
     game_types = {"vs_ai": 0, "r_l": 1, "human": 2, "random": 3}
 
-    def __init__(self, number_of_colors, height, width, game_type, save_images_suffix=False):
+    def __init__(self, number_of_colors, height, width, game_type, save_images_suffix=False, topology='grid',
+                 opponent_depth=1):
         self.number_of_cells = height * width
         self.all_colors = np.arange(number_of_colors)
         self.game_type = game_type
         self.save_images_suffix = save_images_suffix
 
         figure = self.game_type != self.game_types['r_l']
-        self.game_board = FillerBoard(number_of_colors, height, width, figure=figure)
+        self.game_board = FillerBoard(number_of_colors, height, width, figure=figure, topology=topology)
 
         self.turn_count = 0
+        self.history = []
+        self.snapshot_dtype = np.dtype([('board', np.int8, self.number_of_cells),
+                                        ('owner', np.uint8, self.number_of_cells),
+                                        ('edges', np.bool_, (2, self.number_of_cells)),
+                                        ('colors', np.int8, 2),
+                                        ('scores', np.int32, 2),
+                                        ('turn_count', np.int32)])
 
         player_1_starting_cell = (height - 1, 0)
         if self.game_type == self.game_types['vs_ai']:
-            self.player_1 = player.AIPlayer([player_1_starting_cell], self.game_board)
+            self.player_1 = player.AIPlayer([player_1_starting_cell], self.game_board, 1)
         elif self.game_type == self.game_types['r_l']:
-            self.player_1 = player.RLPlayer([player_1_starting_cell], self.game_board)
+            self.player_1 = player.RLPlayer([player_1_starting_cell], self.game_board, 1)
         elif self.game_type == self.game_types['human']:
-            self.player_1 = player.HumanPlayer([player_1_starting_cell], self.game_board)
+            self.player_1 = player.HumanPlayer([player_1_starting_cell], self.game_board, 1)
         elif self.game_type == self.game_types['random']:
-            self.player_1 = player.RandomPlayer([player_1_starting_cell], self.game_board)
+            self.player_1 = player.RandomPlayer([player_1_starting_cell], self.game_board, 1)
 
+        # the opponent plays randomly with a depth of 0, greedily with 1, and searches ahead with more
         player_2_starting_cell = (0, width - 1)
-        self.player_2 = player.AIPlayer([player_2_starting_cell], self.game_board)
+        if opponent_depth > 0:
+            self.player_2 = player.AIPlayer([player_2_starting_cell], self.game_board, 2, depth=opponent_depth)
+        else:
+            self.player_2 = player.RandomPlayer([player_2_starting_cell], self.game_board, 2)
 
     def get_color_options(self):
         """
@@ -189,6 +231,66 @@ class FillerGame:
             print(f"player 2 played {self.player_2.color}:  {self.player_2.score}")
             print()
 
+    def snapshot(self):
+        """
+        Captures the state of the game in a fixed-size record, which can be copied cheaply.
+        The players' edge cells are kept as a mask of the gameboard for each player.
+
+        Returns
+        -------
+        np.ndarray
+            a structured scalar with the gameboard, ownership grid, edge masks, colors, scores, and turn count
+        """
+        snapshot = np.empty((), dtype=self.snapshot_dtype)
+        snapshot['board'] = self.game_board.board.reshape(-1)
+        snapshot['owner'] = self.game_board.owner
+        edges = snapshot['edges']
+        edges[...] = False
+        edges[0, self.player_1.filled_edges] = True
+        edges[1, self.player_2.filled_edges] = True
+        snapshot['colors'] = self.player_1.color, self.player_2.color
+        snapshot['scores'] = self.player_1.score, self.player_2.score
+        snapshot['turn_count'] = self.turn_count
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        Restores the state of the game from a snapshot of this game.
+
+        Parameters
+        ----------
+        snapshot : np.ndarray
+            a snapshot returned by snapshot()
+        """
+        self.game_board.board[...] = snapshot['board'].reshape(self.game_board.board.shape)
+        self.game_board.owner[...] = snapshot['owner']
+        self.turn_count = int(snapshot['turn_count'])
+
+        for i, game_player in enumerate((self.player_1, self.player_2)):
+            game_player.color = snapshot['colors'][i]
+            game_player.score = int(snapshot['scores'][i])
+            game_player.filled_edges = np.flatnonzero(snapshot['edges'][i]).astype(np.int32)
+
+    def make_move(self, action=None):
+        """
+        Plays a single turn after saving a snapshot so that the turn can be undone.
+
+        Parameters
+        ----------
+        action : int, optional
+            the integer for the color to play, when doing RL
+        """
+        self.history.append(self.snapshot())
+        self.play_single_turn(action)
+
+    def undo_move(self):
+        """
+        Undoes the last turn played with make_move.
+        """
+        if not self.history:
+            raise ValueError('There are no moves to undo')
+        self.restore(self.history.pop())
+
     def play_game(self, early_finish=False):
         """
         Completes the entire game by playing turns until the game is over and then prints the result.
@@ -216,19 +318,138 @@ class FillerGame:
 class FillerBoard:
     """
     Implements the functions of the gameboard, which is implemented as a 2D numpy array.
+    Cell adjacency is precomputed as compressed sparse row (CSR) arrays over flat cell indices,
+    so the flood fill and counting functions only touch each cell a constant number of times.
+    The cells that belong to each player are kept in an ownership grid of player ID flags.
     """
 
-    def __init__(self, number_of_colors, height, width, figure=True):
+    __slots__ = ('height', 'width', 'number_of_colors', 'topology', 'board', 'owner',
+                 'neighbour_offsets', 'neighbour_indices')
+
+    topologies = {"grid": 0, "hex": 1}
+
+    # the players' ownership flags are 1 and 2, and this scratch flag marks visited cells while counting
+    visited_flag = 4
+
+    def __init__(self, number_of_colors, height, width, figure=True, topology='grid'):
+        if topology not in self.topologies:
+            raise ValueError(f'Unknown topology {topology!r}, expected one of {list(self.topologies)}')
+        # each player needs a color other than their own and the opponent's to play
+        if not 2 < number_of_colors <= len(COLORS):
+            raise ValueError(f'number_of_colors must be between 3 and {len(COLORS)}')
+
         self.height = height
         self.width = width
         self.number_of_colors = number_of_colors
+        self.topology = topology
 
         if figure:
             plt.figure('Filler')
             plt.ion()
             plt.axis('off')
 
-        self.board = np.random.randint(0, number_of_colors, (height, width))
+        self.board = np.random.randint(0, number_of_colors, (height, width)).astype(np.int8)
+        self.owner = np.zeros(height * width, dtype=np.uint8)
+        self.neighbour_offsets, self.neighbour_indices = self.build_neighbours(height, width, topology)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def build_neighbours(height, width, topology='grid'):
+        """
+        Builds the neighbour index tables for a board in CSR form.
+        The tables are cached and read-only, so they are shared by all boards with the same shape and topology.
+        The neighbours of the cell with flat index i are neighbour_indices[neighbour_offsets[i]:neighbour_offsets[i+1]].
+        Hex boards use offset rows, where odd rows are shifted right by half a cell.
+
+        Parameters
+        ----------
+        height : int
+            the number of rows on the gameboard
+        width : int
+            the number of columns on the gameboard
+        topology : str, optional
+            the neighbourhood of each cell, either 'grid' (4 neighbours) or 'hex' (6 neighbours), by default 'grid'
+
+        Returns
+        -------
+        np.ndarray, np.ndarray
+            the offsets with shape (height * width + 1,) and the flat neighbour indices
+        """
+        coord_y, coord_x = np.divmod(np.arange(height * width, dtype=np.int32), width)
+
+        # up, down, left, right
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        neighbours_y = [coord_y + d_y for d_y, _ in directions]
+        neighbours_x = [coord_x + d_x for _, d_x in directions]
+        if topology == 'hex':
+            # the diagonal neighbours above and below lean towards the side the row is shifted to
+            shift = np.where(coord_y % 2, 1, -1)
+            neighbours_y += [coord_y - 1, coord_y + 1]
+            neighbours_x += [coord_x + shift, coord_x + shift]
+
+        neighbours_y = np.stack(neighbours_y, axis=1)
+        neighbours_x = np.stack(neighbours_x, axis=1)
+        valid = (neighbours_y >= 0) & (neighbours_y < height) & (neighbours_x >= 0) & (neighbours_x < width)
+
+        offsets = np.zeros(height * width + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=offsets[1:])
+        indices = (neighbours_y * width + neighbours_x)[valid].astype(np.int32)
+
+        offsets.flags.writeable = False
+        indices.flags.writeable = False
+        return offsets, indices
+
+    def get_neighbours(self, index):
+        """
+        Gets the neighbours of the specified cell.
+
+        Parameters
+        ----------
+        index : int
+            the flat index of the cell
+
+        Returns
+        -------
+        np.ndarray
+            the flat indices of the neighbouring cells
+        """
+        return self.neighbour_indices[self.neighbour_offsets[index]:self.neighbour_offsets[index + 1]]
+
+    def get_all_neighbours(self, indices):
+        """
+        Gets the neighbours of all of the specified cells at once.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            the flat indices of the cells
+
+        Returns
+        -------
+        np.ndarray
+            the flat indices of the neighbouring cells, which may contain duplicates
+        """
+        starts = self.neighbour_offsets[indices]
+        counts = self.neighbour_offsets[indices + 1] - starts
+        # position of each neighbour within its cell's row of the CSR table
+        positions = np.arange(counts.sum(), dtype=np.int32) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.neighbour_indices[np.repeat(starts, counts) + positions]
+
+    def to_index(self, coord):
+        """
+        Converts coordinates to a flat cell index.
+
+        Parameters
+        ----------
+        coord : tuple
+            the coordinates in (y, x) form
+
+        Returns
+        -------
+        int
+            the flat index of the cell
+        """
+        return coord[0] * self.width + coord[1]
 
     def text_output(self):
         """
@@ -241,6 +462,7 @@ class FillerBoard:
         """
         Outputs the gameboard in a MatPlotLib window that is updated everytime this function is called.
         The 2D numpy array is converted to colors using the COLORS dictionary and then repeated to create an image.
+        Hex boards are drawn with the odd rows shifted right by half a cell.
 
         Parameters
         ----------
@@ -258,14 +480,19 @@ class FillerBoard:
         Returns
         -------
         np.ndarray
-            the image in numpy format with shape (height, width, 3)
+            the image in numpy format with shape (height * 10, width * 10, 3), or (height * 10, width * 10 + 5, 3) \
+                for hex boards
         """
-        masks = [np.where(self.board == i, True, False) for i in range(self.number_of_colors)]
-        output = np.zeros((self.height, self.width, 3), dtype=np.int)
-        for mask, color in zip(masks, list(COLORS.values())[:self.number_of_colors]):
-            output[mask] = color
+        palette = np.array(list(COLORS.values())[:self.number_of_colors]) / 255.0
+        image = np.repeat(np.repeat(palette[self.board], 10, axis=0), 10, axis=1)
+
+        if self.topology == 'hex':
+            hex_image = np.ones((image.shape[0], image.shape[1] + 5, 3))
+            rows = np.arange(image.shape[0]) // 10 % 2 == 1
+            hex_image[~rows, :-5] = image[~rows]
+            hex_image[rows, 5:] = image[rows]
+            image = hex_image
 
-        image = np.repeat(np.repeat(output, 10, axis=0), 10, axis=1)/255.0
         if save:
             plt.imsave(f'{folder_name}/image{image_suffix}.png', image)
 
@@ -291,149 +518,141 @@ class FillerBoard:
         """
         return self.board[coord[0], coord[1]]
 
-    def set_color(self, color, filled):
+    def set_color(self, color, player_id):
         """
-        Sets the color at the specified cells on the gameboard.
+        Sets the color at the cells that belong to the player.
 
         Parameters
         ----------
         color : int
-            the color to set at the specified cells
-        filled : list
-            a list of cells that belong to the player
+            the color to set at the player's cells
+        player_id : int
+            the ownership flag of the player
         """
-        for cell in filled:
-            self.board[cell[0], cell[1]] = color
+        self.board.reshape(-1)[(self.owner & player_id) != 0] = color
 
-    def check_if_filled(self, new_cell, cell_color, filled_edges, filled_surrounded):
+    def fill(self, filled_edges, player_id):
         """
-        Checks if the new cell has the same color.
-        If so, then it will be added to filled_edges.
+        Marks the specified cells as belonging to the player.
 
         Parameters
         ----------
-        new_cell : tuple
-            the coordinates in (y, x) form
-        cell_color : int
-            the color to check at the new cell
-        filled_edges : list
-            a list of edge cells that belong to the player
-        filled_surrounded : list
-            a list of surrounded cells that belong to the player
-
-        Returns
-        -------
-        bool
-            False if the colors don't match, True otherwise
+        filled_edges : np.ndarray
+            the flat indices of the cells to mark
+        player_id : int
+            the ownership flag of the player
         """
-        new_cell_color = self.get_color(new_cell)
-        if new_cell_color != cell_color:
-            return False
-
-        if new_cell not in filled_edges + filled_surrounded:
-            filled_edges.append(new_cell)
+        self.owner[filled_edges] |= player_id
 
-        return True
-
-    def update_filled(self, filled_edges, filled_surrounded):
+    def update_filled(self, filled_edges, player_id):
         """
-        Updates the list of cells that belong to the player.
+        Updates the cells that belong to the player.
         The edge cells will be checked to see if adjoining cells have the same color.
-        If a cell is surrounded by the same color, then it will be moved to the
-        surrounded cells list and not be checked further.
+        If a cell is surrounded by the same color, then it will no longer be an edge and will not be checked further.
 
         Parameters
         ----------
-        filled_edges : list
-            a list of edge cells that belong to the player
-        filled_surrounded : list
-            a list of surrounded cells that belong to the player
-        """
-        surrounded_cells = []
-        for cell in filled_edges:
-            coord_x = cell[1]
-            coord_y = cell[0]
-            color = self.get_color(cell)
-            surrounded = True
+        filled_edges : np.ndarray
+            the flat indices of the edge cells that belong to the player
+        player_id : int
+            the ownership flag of the player
 
-            # up
-            if coord_y - 1 >= 0:
-                surrounded &= self.check_if_filled((coord_y-1, coord_x), color, filled_edges, filled_surrounded)
-
-            # down
-            if coord_y + 1 < self.height:
-                surrounded &= self.check_if_filled((coord_y+1, coord_x), color, filled_edges, filled_surrounded)
-
-            # left
-            if coord_x - 1 >= 0:
-                surrounded &= self.check_if_filled((coord_y, coord_x-1), color, filled_edges, filled_surrounded)
+        Returns
+        -------
+        np.ndarray, np.ndarray
+            the flat indices of the new edge cells and of the newly filled cells
+        """
+        flat_board = self.board.reshape(-1)
+        edges = filled_edges.tolist()
+        number_of_edges = len(edges)
 
-            # right
-            if coord_x + 1 < self.width:
-                surrounded &= self.check_if_filled((coord_y, coord_x+1), color, filled_edges, filled_surrounded)
+        new_edges = []
+        # edges grows while iterating, so newly filled cells are checked in the same pass
+        for index in edges:
+            color = flat_board[index]
+            neighbours = self.get_neighbours(index)
+            same_color = flat_board[neighbours] == color
+            for neighbour in neighbours[same_color].tolist():
+                if not self.owner[neighbour] & player_id:
+                    self.owner[neighbour] |= player_id
+                    edges.append(neighbour)
 
-            if surrounded:
-                surrounded_cells.append(cell)
+            if not same_color.all():
+                new_edges.append(index)
 
-        for cell in surrounded_cells:
-            filled_surrounded.append(cell)
-            filled_edges.remove(cell)
+        return np.array(new_edges, dtype=np.int32), np.array(edges[number_of_edges:], dtype=np.int32)
 
-    def get_color_count(self, color, filled):
+    def get_color_count(self, color, filled_edges):
         """
-        Counts the number of adjacent cells of the specified color.
+        Counts the number of connected cells of the specified color that adjoin the filled cells.
+        The visited cells are temporarily marked with the scratch flag in the ownership grid,
+        which is cleared again before returning.
 
         Parameters
         ----------
         color : int
             the color to count in the adjacent cells
-        filled : list
-            a list of cells that belong to the player
+        filled_edges : np.ndarray
+            the flat indices of the edge cells that belong to the player
 
         Returns
         -------
         int
             the number of the adjacent cells with the specified color
         """
+        flat_board = self.board.reshape(-1)
+        frontier = filled_edges
+        self.owner[frontier] |= self.visited_flag
+        visited = [frontier]
+
         count = 0
-        for cell in filled:
-            coord_x = cell[1]
-            coord_y = cell[0]
-
-            # up
-            if coord_y - 1 >= 0:
-                new_cell = (coord_y-1, coord_x)
-                cell_up_color = self.get_color(new_cell)
-                if cell_up_color == color and new_cell not in filled:
-                    count += 1
-                    filled.append(new_cell)
-
-            # down
-            if coord_y + 1 < self.height:
-                new_cell = (coord_y+1, coord_x)
-                cell_down_color = self.get_color(new_cell)
-                if cell_down_color == color and new_cell not in filled:
-                    count += 1
-                    filled.append(new_cell)
-
-            # left
-            if coord_x - 1 >= 0:
-                new_cell = (coord_y, coord_x-1)
-                cell_left_color = self.get_color(new_cell)
-                if cell_left_color == color and new_cell not in filled:
-                    count += 1
-                    filled.append(new_cell)
-
-            # right
-            if coord_x + 1 < self.width:
-                new_cell = (coord_y, coord_x+1)
-                cell_right_color = self.get_color(new_cell)
-                if cell_right_color == color and new_cell not in filled:
-                    count += 1
-                    filled.append(new_cell)
+        try:
+            while frontier.size:
+                neighbours = self.get_all_neighbours(frontier)
+                unvisited = (self.owner[neighbours] & self.visited_flag) == 0
+                neighbours = neighbours[(flat_board[neighbours] == color) & unvisited]
+                frontier = np.unique(neighbours)
+                self.owner[frontier] |= self.visited_flag
+                visited.append(frontier)
+                count += frontier.size
+        finally:
+            for cells in visited:
+                self.owner[cells] &= ~np.uint8(self.visited_flag)
 
         return count
 
+    def get_filled_count(self, player_id):
+        """
+        Counts the number of cells that belong to the player.
+
+        Parameters
+        ----------
+        player_id : int
+            the ownership flag of the player
+
+        Returns
+        -------
+        int
+            the number of cells that belong to the player
+        """
+        return int(np.count_nonzero(self.owner & player_id))
+
+    def get_filled_mask(self, player_id):
+        """
+        Returns a mask of the cells that belong to the player.
+
+        Parameters
+        ----------
+        player_id : int
+            the ownership flag of the player
+
+        Returns
+        -------
+        np.ndarray
+            a boolean mask with shape (height, width) that is True at the player's cells
+        """
+        return ((self.owner & player_id) != 0).reshape(self.height, self.width)
+
     def get_board(self):
         """
         Flattens the gameboard and returns it as a 1D array.
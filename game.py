@@ -2,10 +2,22 @@
 Use this file to run the game.
 """
 
-from filler import FillerGame
+import argparse
+
+from filler import COLORS, FillerBoard, FillerGame
 
 if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Play Filler.')
+    PARSER.add_argument('--colors', type=int, default=8, help='number of colors, by default 8')
+    PARSER.add_argument('--height', type=int, default=12, help='height of the gameboard, by default 12')
+    PARSER.add_argument('--width', type=int, default=8, help='width of the gameboard, by default 8')
+    PARSER.add_argument('--topology', choices=list(FillerBoard.topologies), default='grid',
+                        help='neighbourhood of each cell, by default grid')
+    ARGS = PARSER.parse_args()
+    if not 2 < ARGS.colors <= len(COLORS):
+        PARSER.error(f'--colors must be between 3 and {len(COLORS)}')
+
     AUTOMATED = input('Enter "y" for AI vs. AI: ') == 'y'
-    FILLER = FillerGame(number_of_colors=8, height=12, width=8,
-                        game_type=FillerGame.game_types['vs_ai' if AUTOMATED else 'human'])
+    FILLER = FillerGame(number_of_colors=ARGS.colors, height=ARGS.height, width=ARGS.width,
+                        game_type=FillerGame.game_types['vs_ai' if AUTOMATED else 'human'], topology=ARGS.topology)
     FILLER.play_game()
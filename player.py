@@ -8,9 +8,13 @@ import numpy as np
 class Player:
     """
     A superclass to implement functions and variables for all players.
+    The cells that belong to the player are kept in the gameboard's ownership grid,
+    and only the edge cells are kept by the player as flat indices.
     """
 
-    def __init__(self, filled, game_board):
+    __slots__ = ('score', 'filled_edges', 'player_id', 'game_board', 'color')
+
+    def __init__(self, filled, game_board, player_id):
         """
         Initializes the player object.
 
@@ -20,18 +24,21 @@ class Player:
             a list of cells that belong to the player
         game_board : FillerBoard
             the gameboard object
+        player_id : int
+            the ownership flag of the player on the gameboard, either 1 or 2
         """
         self.score = 1
-        self.filled_edges = filled
-        self.filled_surrounded = []
+        self.filled_edges = np.array([game_board.to_index(cell) for cell in filled], dtype=np.int32)
+        self.player_id = player_id
         self.game_board = game_board
 
-        self.color = self.game_board.get_color(self.filled_edges[0])
-        self.game_board.update_filled(self.filled_edges, self.filled_surrounded)
+        self.color = self.game_board.get_color(filled[0])
+        self.game_board.fill(self.filled_edges, self.player_id)
+        self.filled_edges, _ = self.game_board.update_filled(self.filled_edges, self.player_id)
 
     def play_turn(self, color_options):
         """
-        Plays a turn by choosing a color, setting it, updating the list of filled cells, and sets the score.
+        Plays a turn by choosing a color, setting it, updating the filled cells, and sets the score.
 
         Parameters
         ----------
@@ -39,9 +46,9 @@ class Player:
             a list of the possible color options (as integers)
         """
         self.color = self.choose_color(color_options)
-        self.game_board.set_color(self.color, self.filled_edges + self.filled_surrounded)
-        self.game_board.update_filled(self.filled_edges, self.filled_surrounded)
-        self.score = len(self.filled_edges) + len(self.filled_surrounded)
+        self.game_board.set_color(self.color, self.player_id)
+        self.filled_edges, _ = self.game_board.update_filled(self.filled_edges, self.player_id)
+        self.score = self.game_board.get_filled_count(self.player_id)
 
     def choose_color(self, color_options):
         """
@@ -55,6 +62,8 @@ class HumanPlayer(Player):
     A subclass of Player in which the user can play against the AI.
     """
 
+    __slots__ = ()
+
     def choose_color(self, color_options):
         """
         Chooses a color using valid user input.
@@ -90,6 +99,26 @@ class AIPlayer(Player):
     A subclass of Player in which the colors are chosen to maximize the score.
     """
 
+    __slots__ = ('depth',)
+
+    def __init__(self, filled, game_board, player_id, depth=1):
+        """
+        Initializes the AI player object.
+
+        Parameters
+        ----------
+        filled : list
+            a list of cells that belong to the player
+        game_board : FillerBoard
+            the gameboard object
+        player_id : int
+            the ownership flag of the player on the gameboard, either 1 or 2
+        depth : int, optional
+            the number of the player's own turns to search ahead, by default 1 (greedy)
+        """
+        super().__init__(filled, game_board, player_id)
+        self.depth = depth
+
     def choose_color(self, color_options):
         """
         Chooses a color that will maximize the score using depth-first search.
@@ -105,16 +134,67 @@ class AIPlayer(Player):
             the integer of the best color
         """
         np.random.shuffle(color_options)
-        counts = [self.game_board.get_color_count(color, self.filled_edges.copy()) for color in color_options]
+        if self.depth > 1:
+            # the options leave out the player's and the opponent's colors, which may be the same color
+            other_colors = set(range(self.game_board.number_of_colors)) - {int(color) for color in color_options}
+            opponent_color = next(iter(other_colors - {int(self.color)}), int(self.color))
+            counts = [self.search(self.game_board, self.filled_edges, color, opponent_color, self.depth)
+                      for color in color_options]
+        else:
+            counts = [self.game_board.get_color_count(color, self.filled_edges) for color in color_options]
 
         return color_options[np.argmax(counts)]
 
+    def search(self, game_board, filled_edges, color, opponent_color, depth):
+        """
+        Plays the color on the gameboard, searches the player's following turns, and then undoes the color.
+        The opponent's turns are not simulated, so the opponent's color stays unplayable at every depth.
+
+        Parameters
+        ----------
+        game_board : FillerBoard
+            the gameboard object, which is left unchanged
+        filled_edges : np.ndarray
+            the flat indices of the edge cells that belong to the player
+        color : int
+            the color to play
+        opponent_color : int
+            the opponent's current color, which can not be played
+        depth : int
+            the number of turns left to search
+
+        Returns
+        -------
+        int
+            the most cells that can be gained by playing the color and then the best following colors
+        """
+        flat_board = game_board.board.reshape(-1)
+        owned = (game_board.owner & self.player_id) != 0
+        previous_colors = flat_board[owned]
+
+        flat_board[owned] = color
+        edges, filled = game_board.update_filled(filled_edges, self.player_id)
+        gained = filled.size
+
+        if depth > 1:
+            gained += max(self.search(game_board, edges, next_color, opponent_color, depth - 1)
+                          for next_color in range(game_board.number_of_colors)
+                          if next_color not in (color, opponent_color))
+
+        # the newly filled cells already had the played color, so only the previously owned cells are recolored
+        game_board.owner[filled] &= ~np.uint8(self.player_id)
+        flat_board[owned] = previous_colors
+
+        return gained
+
 
 class RandomPlayer(Player):
     """
     A subclass of Player in which the colors are chosen randomly.
     """
 
+    __slots__ = ()
+
     def choose_color(self, color_options):
         """
         Chooses a color randomly.
@@ -137,6 +217,8 @@ class RLPlayer(Player):
     A subclass of Player in which the color is pre-selected by an RL agent.
     """
 
+    __slots__ = ()
+
     def choose_color(self, color_options):
         """
         Chooses the pre-selected color.
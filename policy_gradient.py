@@ -1,17 +1,23 @@
 import numpy as np
 import tensorflow as tf
 
-from filler import FillerEnv
+from curriculum import Curriculum
+from filler import COLORS, FillerEnv
 
 
 class PolicyGradient:
-    def __init__(self, n_episodes, continue_training=False, gamma=0.9, update_after_episodes=10, learning_rate=0.001, images_after_episodes=10):
+    def __init__(self, n_episodes, continue_training=False, gamma=0.9, update_after_episodes=10, learning_rate=0.001, images_after_episodes=10,
+                 number_of_colors=6, height=8, width=5, topology='grid', curriculum=None):
         self.n_episodes = n_episodes
         self.gamma = gamma
         self.update_after_episodes = update_after_episodes
         self.images_after_episodes = images_after_episodes
 
-        self.env = FillerEnv(number_of_colors=6, height=8, width=5)
+        self.curriculum = curriculum
+        if self.curriculum:
+            self.env = self.curriculum.make_env()
+        else:
+            self.env = FillerEnv(number_of_colors=number_of_colors, height=height, width=width, topology=topology)
 
         self.model = self.create_model(
             learning_rate=learning_rate) if not continue_training else \
@@ -19,12 +25,17 @@ class PolicyGradient:
                                                                    "_logits_loss": self._logits_loss})
 
     def create_model(self, learning_rate):
-        array_input = tf.keras.layers.Input(shape=(self.env.height * self.env.width + 2,))
-        hidden_layer = tf.keras.layers.Dense(15, activation='relu')(array_input)
-        logits = tf.keras.layers.Dense(self.env.number_of_colors)(hidden_layer)
+        # the board size is left unspecified and pooled away so the same model can play any board
+        board_input = tf.keras.layers.Input(shape=(None, None, len(COLORS) + 2))
+        conv_layer = tf.keras.layers.Conv2D(16, 3, padding='same', activation='relu')(board_input)
+        conv_layer = tf.keras.layers.Conv2D(16, 3, padding='same', activation='relu')(conv_layer)
+        pooled = tf.keras.layers.Concatenate()([tf.keras.layers.GlobalAveragePooling2D()(conv_layer),
+                                                tf.keras.layers.GlobalMaxPooling2D()(conv_layer)])
+        hidden_layer = tf.keras.layers.Dense(15, activation='relu')(pooled)
+        logits = tf.keras.layers.Dense(len(COLORS))(hidden_layer)
         value = tf.keras.layers.Dense(1)(hidden_layer)
 
-        model = tf.keras.Model(inputs=array_input, outputs=[logits, value])
+        model = tf.keras.Model(inputs=board_input, outputs=[logits, value])
         model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
                       loss=[self._logits_loss, self._value_loss])
         print('Model compiled')
@@ -80,7 +91,7 @@ class PolicyGradient:
 
             done = False
             while not done:
-                all_obs.append(obs.reshape(-1))
+                all_obs.append(obs[0])
                 action, value = self.get_action_and_value(obs, random=e_n < self.update_after_episodes * 2)
                 obs, reward, done = self.env.step(action)
 
@@ -89,6 +100,8 @@ class PolicyGradient:
                 e_rewards.append(reward)
 
             rewards.append(sum(e_rewards))
+            if self.curriculum:
+                self.curriculum.record(self.env.game.player_1.score > self.env.game.player_2.score)
             discounted_rewards = self.discount_rewards(e_rewards)
             advantages = np.subtract(discounted_rewards, e_values)
 
@@ -112,12 +125,19 @@ class PolicyGradient:
                 print(f'Episode {e_n}\tAverage Reward: {np.mean(rewards[-self.update_after_episodes:]):.4f}\t' +
                       f'Average Logit Loss: {np.mean(logit_losses[-self.update_after_episodes:]):.4f}\t' +
                       f'Average Value Loss: {np.mean(value_losses[-self.update_after_episodes:]):.4f}')
+
+                # the stage only changes after an update so that each batch has a single board size
+                if self.curriculum and self.curriculum.update():
+                    self.env = self.curriculum.make_env()
+                    print(f'Episode {e_n}\tCurriculum Stage {self.curriculum.stage}: ' +
+                          f'{self.curriculum.stages[self.curriculum.stage]}')
             elif not e_n % (self.update_after_episodes/5):
                 print(f'Episode {e_n}')
 
 
 if __name__ == "__main__":
-    P_G = PolicyGradient(n_episodes=100000, update_after_episodes=100, images_after_episodes=1000)
+    P_G = PolicyGradient(n_episodes=100000, update_after_episodes=100, images_after_episodes=1000,
+                         curriculum=Curriculum())
     P_G.train()
     # P_G = PolicyGradient(n_episodes=1000000, continue_training=True, update_after_episodes=500, images_after_episodes=50000)
     # P_G.train(continue_training=60000)